@@ -1 +1 @@
-from .connect import initialize_connection, ping_host, check_connection
\ No newline at end of file
+from .connect import initialize_connection, reconnect, ping_host, check_connection, CHECK_TTL
\ No newline at end of file
@@ -1,7 +1,43 @@
+import logging
+import math
+import select
+import shutil
+import socket
 import subprocess
 import time
 import sys
 import pymcprotocol
+import utility
+
+# How long a check_connection verdict is reused before probing the PLC again
+CHECK_TTL = 2.0
+
+# Resolve the ping binary once at import, falling back to the usual location
+_PING_PATH = shutil.which("ping") or "/bin/ping"
+
+# Fixed part of the ping command line: numeric output (no reverse DNS), quiet, one packet
+_PING_BASE = [_PING_PATH, "-n", "-q", "-c", "1"]
+
+# Result of the last real probe, shared by every check_connection call
+_last_check = {"ts": float("-inf"), "ok": False}
+
+def _tune_socket(pymc3e, logger):
+    """Disable Nagle and enable TCP keepalive on the pymcprotocol socket.
+
+    MC protocol is a small request/response exchange, so Nagle combined with
+    delayed ACKs only adds latency to every read and write. Keepalive lets the
+    kernel notice a dead PLC without relying on check_connection alone.
+    """
+    try:
+        sock = pymc3e._sock
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if hasattr(socket, "TCP_KEEPIDLE"):  # Linux only
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+    except (AttributeError, OSError) as e:
+        logger.warning("Could not tune PLC socket options: %s", e)
 
 def initialize_connection(plc_ip, plc_port, logger, retries=5, delay=2):
     """Initialize connection to PLC with retries."""
@@ -9,37 +45,106 @@ def initialize_connection(plc_ip, plc_port, logger, retries=5, delay=2):
     for attempt in range(retries):
         try:
             pymc3e.connect(plc_ip, plc_port)
+            _tune_socket(pymc3e, logger)
             logger.info("Connected to PLC successfully.")
             return pymc3e
         except TimeoutError:
-            logger.error("Connection attempt %d failed. Retrying in %d seconds...", attempt + 1, delay)
-            time.sleep(delay)
+            wait = utility.backoff(attempt, delay)
+            logger.error("Connection attempt %d failed. Retrying in %.1f seconds...", attempt + 1, wait)
+            time.sleep(wait)
     raise ConnectionError("Failed to connect to PLC after multiple attempts.")
 
-def ping_host(host, logger):
-    """Ping the PLC to check if it is reachable."""
+def reconnect(pymc3e, logger):
+    """Reopen the PLC connection on the same pymc3e object, so everyone holding it keeps working."""
     try:
-        # Specify the full path to the ping command
-        ping_path = "/bin/ping"  # Change this path if necessary based on your system
-        response = subprocess.run([ping_path, "-c", "1", host], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        pymc3e.close()
+    except OSError:
+        pass  # The old socket is already broken
+    pymc3e.connect(pymc3e._ip, pymc3e._port)
+    _tune_socket(pymc3e, logger)
+    logger.info("Reconnected to PLC at %s:%d.", pymc3e._ip, pymc3e._port)
+
+def ping_host(host, logger, port=None, timeout=1.0):
+    """Check if the PLC is reachable.
+
+    When a port is given, a TCP connection to the PLC's MC protocol port is used
+    as the probe instead of forking /bin/ping. A refused connection still means
+    the PLC answered, so only timeouts and unreachable errors count as a failure.
+    Without a port, fall back to a single ICMP ping.
+    """
+    if port is not None:
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        except ConnectionRefusedError:
+            return True
+        except OSError as e:
+            logger.error("TCP probe to %s:%d failed: %s", host, port, e)
+            return False
+
+    try:
+        cmd = _PING_BASE + ["-W", str(max(1, math.ceil(timeout))), host]
+        response = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         
         if response.returncode == 0:
             return True
         else:
-            logger.error("Ping failed to %s. Response: %s", host, response.stderr.decode())
+            logger.error("Ping failed to %s. rc=%d", host, response.returncode)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Ping stderr: %s", response.stderr.decode(errors="replace"))
             return False
     except Exception as e:
         logger.error("Error while pinging the host: %s", e)
         return False
         
-def check_connection(pymc3e, plc_ip, plc_port, logger, retry_attempts=3, retry_delay=5):
-    """Check if the PLC is still connected using ping."""
+def _peek_socket(pymc3e):
+    """Ask the live MC protocol socket whether the PLC is still there.
+
+    Returns True if the connection is up, False if the PLC closed it, and None
+    when there is no usable socket and the caller has to probe the network.
+    MSG_PEEK leaves any pending bytes for pymcprotocol to read.
+
+    pymcprotocol sets a timeout on its socket, so CPython waits for the socket
+    to become readable before recv sees MSG_DONTWAIT. A zero-timeout select
+    is asked first, and recv only runs once it is known to return at once.
+    """
+    sock = getattr(pymc3e, "_sock", None)
+    if sock is None or not getattr(pymc3e, "_is_connected", False):
+        return None
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return True  # Connected, nothing pending
+        data = sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+    except BlockingIOError:
+        return True
+    except (OSError, ValueError):
+        return None  # ValueError: the socket was closed underneath us
+    return data != b""  # An empty read means the peer closed the connection
+
+def check_connection(pymc3e, plc_ip, plc_port, logger, retry_attempts=3, retry_delay=5, check_ttl=CHECK_TTL):
+    """Check if the PLC is still connected.
+
+    The live MC protocol socket is asked first, which costs a zero-timeout
+    select and at most one recv. Only without a usable socket is the PLC's port probed over the
+    network. The result is reused for check_ttl seconds, so callers polling in
+    a tight loop only check once per TTL window.
+    """
+    now = time.monotonic()
+    if now - _last_check["ts"] < check_ttl:
+        return _last_check["ok"]
+
     try:
-        # First, ping the PLC to check its availability
-        if ping_host(plc_ip, logger):
+        # First, check the existing connection, then fall back to probing the PLC
+        reachable = _peek_socket(pymc3e)
+        if reachable is None:
+            reachable = ping_host(plc_ip, logger, port=plc_port)
+        _last_check["ts"] = now
+        _last_check["ok"] = reachable
+        if reachable:
             return True        
         else:
-            logger.error("PLC is not reachable via ping. IP: %s", plc_ip)
+            logger.error("PLC is not reachable. IP: %s", plc_ip)
             return False
     except Exception as e:
         logger.error("PLC connection lost: %s", e)
@@ -51,8 +156,9 @@ def check_connection(pymc3e, plc_ip, plc_port, logger, retry_attempts=3, retry_d
                 pymc3e = initialize_connection(plc_ip, plc_port, logger)  # Attempt to reconnect
                 return True
             except ConnectionError:
-                logger.error("Reconnection attempt %d failed. Retrying in %d seconds...", attempt + 1, retry_delay)
-                time.sleep(retry_delay)
+                wait = utility.backoff(attempt, retry_delay)
+                logger.error("Reconnection attempt %d failed. Retrying in %.1f seconds...", attempt + 1, wait)
+                time.sleep(wait)
 
         logger.critical("Failed to reconnect after %d attempts. Exiting...", retry_attempts)
         sys.exit(1)  # Exit if reconnection fails after multiple attempts
\ No newline at end of file
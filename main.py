@@ -4,7 +4,6 @@ and interacts with the pymcprotocol library for reading and writing data to PLCs
 
 Modules:
 - threading: For concurrent execution and handling of serial data processing.
-- time: For managing timing and delays.
 - logging: For logging messages and errors.
 - sys: For system-specific parameters and functions.
 - pymcprotocol: For communication with PLC devices using the MC Protocol 3E.
@@ -12,21 +11,16 @@ Modules:
 """
 
 import threading
-import time
 import logging
+import logging.handlers
 import sys
 import queue
+import selectors
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import connect
 import utility
 import process
 
-# Configure logging to include date and time
-logging.basicConfig(
-    stream=sys.stdout,
-    level=logging.INFO,  # Set the logging level to INFO or higher
-    format='%(asctime)s - %(levelname)s - %(message)s',  # Include timestamp, log level, and message
-    datefmt='%Y-%m-%d %H:%M:%S'  # Specify date and time format
-)
 logger = logging.getLogger(__name__)
 
 # Set up serial communication
@@ -43,98 +37,158 @@ port_to_headdevice_and_bitunit = {
     "/dev/ttyUSB2": ("D6564", "M3500")
 }
 
+# Seconds between PLC connection checks in the main loop
+CHECK_INTERVAL = 5.0
+
+# Longest the monitor thread blocks in select before checking stop_event
+MONITOR_TIMEOUT = 0.5
+
+
+def start_logging():
+    """
+    Route all log records through a queue to stdout and return the started QueueListener.
+
+    Log calls only put the record on the queue; the listener formats it and
+    writes it to stdout on its own thread, so the serial path never waits on
+    the console. The handler and the listener are installed together, so no
+    records pile up in a queue nobody drains. Stop the listener on exit.
+    """
+    log_queue = queue.SimpleQueue()
+    stdout_handler = logging.StreamHandler(sys.stdout)
+    stdout_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(levelname)s - %(message)s',  # Include timestamp, log level, and message
+        datefmt='%Y-%m-%d %H:%M:%S'  # Specify date and time format
+    ))
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)  # Set the logging level to INFO or higher
+    listener = logging.handlers.QueueListener(log_queue, stdout_handler)
+    listener.start()
+    return listener
+
 
 def main(pymc3e, PLC_IP, PLC_PORT):
     """Main function to run the PLC connection and data processing."""
     utility.initialize_serial_connections(serial_ports)
 
-    # Shared queue for producer (monitoring) and consumer (worker) threads
-    data_queue = queue.Queue()
-
     # Stop event for graceful shutdown
     stop_event = threading.Event()
 
-    # State tracking for each port
-    states = {
-        port: {"buffer": b"", "last_weight": 0, "last_update_time": 0}
-        for port in port_to_headdevice_and_bitunit
+    # Serial connection, PLC devices and processing state for each port
+    ports = {
+        port: process.PortState(port, headdevice, bitunit, ser=serial_ports[port])
+        for port, (headdevice, bitunit) in port_to_headdevice_and_bitunit.items()
     }
 
-    # Worker function (consumer)
-    def worker():
-        while not stop_event.is_set():
+    def supervised(target):
+        """Run target; if it dies, log why and stop the whole program instead of hanging."""
+        def run():
             try:
-                ser, headdevice, bitunit, states = data_queue.get(timeout=1)  # Block until there's data or timeout
-                
-                # Prepare the context dictionary with all necessary data
-                context = {
-                    "ser": ser,
-                    "headdevice": headdevice,
-                    "bitunit": bitunit,
-                    "pymc3e": pymc3e,
-                    "logger": logger,
-                    "state": states,  # State specific to this port
-                    "stop_event": stop_event  # Pass the stop_event here
-                }
-
-                # Pass the context to the processing function
-                process.smode_process_serial_data(context)
-                data_queue.task_done()
-            except queue.Empty:
-                continue  # Continue if the queue is empty
+                target()
             except Exception as e:
-                logger.error("Worker encountered an unexpected error: %s", e)
-
-
-    # Start a pool of worker threads
-    num_worker_threads = 10
-    threads = [threading.Thread(target=worker, daemon=True) for _ in range(num_worker_threads)]
-    for thread in threads:
-        thread.start()
-
-    # Monitor function (producer)
+                logger.exception("%s thread died: %s", threading.current_thread().name, e)
+                stop_event.set()
+        return run
+
+    # All PLC writes go through one thread, so the monitor never waits on the PLC
+    plc_writer = process.PlcWriter(pymc3e, logger, stop_event,
+                                   reconnect=lambda: connect.reconnect(pymc3e, logger))
+
+    # Register every open serial port so the monitor sleeps until one has data.
+    # Each port's context dictionary is prepared once and travels with its fd.
+    selector = selectors.DefaultSelector()
+    contexts = []
+    for state in ports.values():
+        if state.ser is not None:
+            context = {
+                "ser": state.ser,
+                "headdevice": state.headdevice,
+                "bitunit": state.bitunit,
+                "pymc3e": pymc3e,
+                "logger": logger,
+                "state": state,  # State specific to this port
+                "stop_event": stop_event,  # Pass the stop_event here
+                "selector": selector  # Lets a disconnected port be unregistered
+            }
+            selector.register(state.ser.fileno(), selectors.EVENT_READ, data=context)
+            contexts.append(context)
+
+    # Monitor function: processes each readable port right here, as handing it
+    # to a worker thread costs more than parsing a few frames
     def monitor():
         while not stop_event.is_set():
-            for port, (headdevice, bitunit) in port_to_headdevice_and_bitunit.items():
-                ser = serial_ports[port]
-                if ser and ser.is_open and ser.in_waiting > 0:  # Check for new data
-                    try:
-                        # Enqueue serial port data for processing
-                        data_queue.put((ser, headdevice, bitunit, states[port]))
-                    except queue.Full:
-                        logger.warning("Data queue is full. Dropping new data.")
-            time.sleep(0.1)  # Reduce CPU usage in the monitor thread
-
-    # Uncomment to use utility.monitor_serial_ports to check the heathly status
-    # def monitor():
-    #     while not stop_event.is_set():
-    #         try:
-    #             utility.monitor_serial_ports(serial_ports, port_to_headdevice_and_bitunit, states, data_queue, stop_event, logger)
-    #         except Exception as e:
-    #             logger.error(f"Monitor encountered an error: {e}")
-    #         time.sleep(0.1)  # Reduce CPU usage in the monitor thread
-
-    monitor_thread = threading.Thread(target=monitor, daemon=True)
+            # Block until a port is readable or the next reset is due, but wake
+            # at least every MONITOR_TIMEOUT seconds to notice stop_event
+            timeout = MONITOR_TIMEOUT
+            for context in contexts:
+                delay = process.smode_reset_delay(context)
+                if delay is not None and delay < timeout:
+                    timeout = delay
+            ready = selector.select(timeout=timeout)
+
+            # Collect the PLC writes of every port that was ready and hand them over together
+            writes = process.new_write_batch()
+            for key, _ in ready:
+                context = key.data
+                context["writes"] = writes
+                try:
+                    process.smode_process_serial_data(context)
+                except Exception as e:
+                    logger.error("Error while processing %s: %s", context["state"].port, e)
+
+            # A scale that went quiet is never ready, so its reset timeout is
+            # checked here; the select timeout above wakes the loop for it
+            for context in contexts:
+                context["writes"] = writes
+                process.smode_reset_on_timeout(context)
+
+            plc_writer.submit(writes)
+
+    monitor_thread = threading.Thread(target=supervised(monitor), name="monitor", daemon=True)
     monitor_thread.start()
 
+    writer_thread = threading.Thread(target=supervised(plc_writer.run), name="plc-writer", daemon=True)
+    writer_thread.start()
+
+    # Run the connection check off the main thread so a wedged probe cannot freeze it
+    probe_executor = ThreadPoolExecutor(max_workers=1)
+    probe = None
+
     try:
-        # Main loop: Check PLC connection
-        while True:
-            if not connect.check_connection(pymc3e, PLC_IP, PLC_PORT, logger):
+        # Main loop: Check PLC connection until it is lost or a thread stops the program
+        while not stop_event.is_set():
+            if probe is None:
+                probe = probe_executor.submit(connect.check_connection, pymc3e, PLC_IP, PLC_PORT, logger)
+            try:
+                connected = probe.result(timeout=connect.CHECK_TTL)
+            except FutureTimeoutError:
+                logger.warning("PLC connection check did not finish within %.1f seconds.", connect.CHECK_TTL)
+                continue  # Keep waiting on the same probe
+            probe = None
+
+            if not connected:
                 logger.critical("PLC connection lost. Exiting program.")
                 break  # Exit the loop if the connection is lost
 
-            time.sleep(0.1)  # Reduce CPU usage in the main loop
+            stop_event.wait(CHECK_INTERVAL)  # Nothing to do between checks; wakes at once on shutdown
 
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received. Shutting down gracefully...")
     except Exception as e:
         logger.critical("Terminating program due to unexpected error: %s", e)
     finally:
-        stop_event.set()  # Signal worker threads to stop
-        monitor_thread.join()  # Wait for the monitor thread to finish
-        for thread in threads:
-            thread.join()  # Wait for all worker threads to finish
+        stop_event.set()  # Signal the monitor and PLC writer threads to stop
+        probe_executor.shutdown(wait=False)
+        # Every loop wakes at least every 0.5 s, so a thread still alive after the
+        # timeout is stuck; it is a daemon and is left behind rather than waited on
+        monitor_thread.join(timeout=2)
+        if monitor_thread.is_alive():
+            logger.warning("Monitor thread did not stop within 2 seconds.")
+        else:
+            selector.close()
+        writer_thread.join(timeout=2)  # Sends the last batch before the PLC connection closes
+        if writer_thread.is_alive():
+            logger.warning("PLC writer thread did not stop within 2 seconds.")
         for ser in serial_ports.values():
             if ser is not None:
                 ser.close()
@@ -146,5 +200,9 @@ def main(pymc3e, PLC_IP, PLC_PORT):
 if __name__ == "__main__":
     PLC_IP = "192.168.3.61"
     PLC_PORT = 5014
-    pymc3e = connect.initialize_connection(PLC_IP, PLC_PORT, logger)
-    main(pymc3e, PLC_IP, PLC_PORT)
\ No newline at end of file
+    log_listener = start_logging()
+    try:
+        pymc3e = connect.initialize_connection(PLC_IP, PLC_PORT, logger)
+        main(pymc3e, PLC_IP, PLC_PORT)
+    finally:
+        log_listener.stop()  # Write out whatever is still queued
\ No newline at end of file
@@ -1 +1,3 @@
-from .serial import smode_process_serial_data, process_serial_data
\ No newline at end of file
+from .serial import smode_process_serial_data, smode_reset_on_timeout, smode_reset_delay, process_serial_data
+from .plcwrite import new_write_batch, flush_writes, PlcWriter
+from .state import PortState
\ No newline at end of file
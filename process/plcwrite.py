@@ -0,0 +1,168 @@
+import threading
+from pymcprotocol.mcprotocolerror import MCProtocolError
+import utility
+
+def _to_dword(values):
+    """Packs a [low_word, high_word] pair into the signed 32-bit value randomwrite expects."""
+    value = (values[0] & 0xFFFF) | ((values[1] & 0xFFFF) << 16)
+    return value - 0x100000000 if value & 0x80000000 else value
+
+def new_write_batch():
+    """Returns an empty batch for collecting PLC writes from several ports."""
+    return {"words": {}, "bits": {}}
+
+def flush_writes(pymc3e, writes):
+    """
+    Sends the collected word and bit writes to the PLC, one MC protocol frame per device type.
+
+    Word pairs are written as double words, so the low word lands on the head
+    device and the high word on the next one, exactly as batchwrite_wordunits
+    would write [low_word, high_word].
+
+    Parameters
+    ----------
+    pymc3e : pymcprotocol.Type3E
+        The PLC connection object.
+
+    writes : dict
+        Batch from new_write_batch(): "words" maps a head device to a
+        (low_word, high_word) pair, "bits" maps a bit unit to 0 or 1.
+        The batch is emptied once sent.
+    """
+    words = writes["words"]
+    bits = writes["bits"]
+    if words:
+        pymc3e.randomwrite(word_devices=[], word_values=[],
+                           dword_devices=list(words), dword_values=[_to_dword(v) for v in words.values()])
+        words.clear()
+    if bits:
+        pymc3e.randomwrite_bitunits(bit_devices=list(bits), values=list(bits.values()))
+        bits.clear()
+
+class PlcWriter:
+    """
+    Owns all writes to the PLC socket and sends them from a single thread.
+
+    Producers hand over batches with submit() and return at once. Batches that
+    arrive while a frame is in flight are merged, so the newest value per
+    device wins and the next flush carries all of them in one frame per type.
+    Bit units are the exception: a batch that changes a bit already pending
+    with another value is queued behind it, so the PLC still sees every edge.
+    While the PLC is unreachable at most max_pending batches are kept; past
+    that they are collapsed into one holding the latest word and bit per
+    device, so an outage neither grows memory nor replays stale edges later.
+
+    Parameters
+    ----------
+    pymc3e : pymcprotocol.Type3E
+        The PLC connection object.
+
+    logger : logging.Logger
+        Logger for logging messages.
+
+    stop_event : threading.Event
+        Ends run() once set; anything still pending is sent first.
+
+    reconnect : callable, optional
+        Called with no arguments when a write fails with a socket error or the
+        connection is found closed; it should reopen the connection on the
+        same pymc3e object. The batch is retried with backoff, so a PLC that
+        is still rebooting is picked up again once it accepts connections.
+        After max_retries reconnects, or one once stop_event is set, the
+        batch is dropped. Without it, the failed batch is only logged.
+        A batch the PLC answers with an error code is dropped either way.
+
+    max_retries : int, optional
+        Number of reconnects tried for one batch before it is given up.
+
+    max_pending : int, optional
+        Number of queued batches after which the queue is collapsed.
+    """
+
+    def __init__(self, pymc3e, logger, stop_event, reconnect=None, max_retries=5, max_pending=16):
+        self.pymc3e = pymc3e
+        self.logger = logger
+        self.stop_event = stop_event
+        self.reconnect = reconnect
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = []  # Batches to send in order
+        self._wakeup = threading.Event()
+
+    def submit(self, writes):
+        """Queues a batch from new_write_batch() for the writer thread; the batch is not kept."""
+        if not (writes["words"] or writes["bits"]):
+            return
+        with self._lock:
+            last = self._pending[-1] if self._pending else None
+            if last is None or any(last["bits"].get(bit, value) != value for bit, value in writes["bits"].items()):
+                if len(self._pending) >= self.max_pending:
+                    # Edges this far behind are stale; keep only the final state per device
+                    last = new_write_batch()
+                    for batch in self._pending:
+                        last["words"].update(batch["words"])
+                        last["bits"].update(batch["bits"])
+                    self._pending = [last]
+                    self.logger.warning("PLC writes are backing up, collapsed %d queued batches.", self.max_pending)
+                else:
+                    last = new_write_batch()
+                    self._pending.append(last)
+            last["words"].update(writes["words"])
+            last["bits"].update(writes["bits"])
+        self._wakeup.set()
+
+    def _connected(self):
+        # A mock or an older pymcprotocol may not have the flag
+        return getattr(self.pymc3e, "_is_connected", True)
+
+    def _send(self, writes):
+        """Sends one batch, reconnecting with backoff until it is through or retries run out."""
+        attempt = 0
+        broken = False  # The last write failed, so the socket cannot be trusted
+        while True:
+            try:
+                # A failed reconnect leaves pymcprotocol marked as not connected,
+                # and every write would then fail without touching the socket
+                if self.reconnect is not None and (broken or not self._connected()):
+                    self.reconnect()
+                    broken = False
+                flush_writes(self.pymc3e, writes)  # Only what was not sent is left in the batch
+                return
+            except MCProtocolError as e:
+                # The PLC answered, so the link is fine; resending the same frame gets the same answer
+                self.logger.error("PLC rejected batch, dropping it: %s", e)
+                return
+            except Exception as e:
+                # pymcprotocol raises a plain Exception when it knows the socket is closed
+                if self.reconnect is None or not (isinstance(e, OSError) or not self._connected()):
+                    raise
+                if attempt >= self.max_retries or (attempt and self.stop_event.is_set()):
+                    self.logger.error("PLC write failed after %d reconnects, dropping batch: %s", attempt, e)
+                    return
+                broken = True
+                if attempt:
+                    wait = utility.backoff(attempt - 1, 1)
+                    self.logger.warning("PLC write failed (%s), reconnecting in %.1f seconds.", e, wait)
+                    self.stop_event.wait(wait)
+                else:
+                    self.logger.warning("PLC write failed (%s), reconnecting.", e)
+                attempt += 1
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for writes in pending:
+            try:
+                self._send(writes)
+            except Exception as e:
+                self.logger.error("Failed to write batch to PLC: %s", e)
+
+    def run(self):
+        """Sends submitted batches until stop_event is set. Meant as a thread target."""
+        while not self.stop_event.is_set():
+            if not self._wakeup.wait(timeout=0.5):
+                continue
+            self._wakeup.clear()  # Clear before taking the batch so a later submit wakes us again
+            self._flush()
+        self._flush()
@@ -1,64 +1,154 @@
+import os
 import time
-import re
+import functools
+import select
+import logging
 import utility
+from .state import PortState
+
+# Bytes kept without seeing a frame terminator before the buffer is discarded
+_MAX_BUFFER = 4096
+
+# Seconds without a larger weight before smode_reset_on_timeout clears a port
+_RESET_TIMEOUT = 10
+
+def _pop_frames(buffer, logger):
+    r"""
+    Remove the complete ``\r\n`` terminated frames from the front of buffer.
+
+    The buffer is scanned in place and trimmed once, so a partial frame at the
+    end stays in it for the next read.
+
+    Parameters
+    ----------
+    buffer : bytearray
+        Received data; modified in place.
+
+    logger : logging.Logger
+        Logger for logging messages.
+
+    Returns
+    -------
+    list of bytes
+        The frames, without their terminators.
+    """
+    frames = []
+    start = 0
+    while True:
+        end = buffer.find(b"\r\n", start)
+        if end < 0:
+            break
+        frames.append(bytes(buffer[start:end]))
+        start = end + 2
+    del buffer[:start]
+    if len(buffer) > _MAX_BUFFER:
+        logger.error("No frame terminator in %d bytes, discarding buffer.", len(buffer))
+        buffer.clear()
+    return frames
+
+@functools.lru_cache(maxsize=128)
+def _parse_weight(message):
+    r"""
+    Parse one scale frame of the form ``ST,+000123.45  g``.
+
+    Equivalent to matching ``^ST,\+(\d+\.\d+)\s+g$`` on the stripped frame,
+    but checks the fixed prefix and suffix with byte comparisons and reads the
+    number as an integer, so no regex, decode or float is involved. A scale
+    holding a steady load repeats the same frame, so results are cached.
+
+    Parameters
+    ----------
+    message : bytes
+        One line received from the scale, without the ``\r\n`` terminator.
+
+    Returns
+    -------
+    int or None
+        The weight in hundredths (``000123.45`` -> ``12345``), or None if the
+        frame is not a stable weight reading.
+    """
+    message = message.strip()
+    if not (message.startswith(b"ST,+") and message.endswith(b"g")):
+        return None
+    number = message[4:-1]
+    if not number[-1:].isspace():
+        return None  # The unit has to be separated from the number
+    whole, dot, frac = number.rstrip().partition(b".")
+    if not (dot and whole.isdigit() and frac.isdigit()):
+        return None
+    # Only the first two decimals count, as int(float(...) * 100) truncated them
+    return int(whole) * 100 + int(frac[:2].ljust(2, b"0"))
+
+def _close_disconnected(context, reason):
+    """
+    Take a serial port that went away out of service, logging it once.
+
+    A hung-up or unplugged tty stays readable forever, so it is unregistered
+    from the monitor's selector before it is closed; otherwise every select
+    would return it again at once.
+
+    Parameters
+    ----------
+    context : dict
+        The port's context dictionary; the optional selector is the one its fd
+        is registered with.
+
+    reason : object
+        What showed the port was gone, for the log message.
+    """
+    ser = context["ser"]
+    selector = context.get("selector")
+    if selector is not None:
+        try:
+            selector.unregister(ser.fileno())
+        except (KeyError, ValueError):
+            pass  # Not registered, or already closed
+    ser.close()
+    context["logger"].error("Serial port %s disconnected (%s); closed it.", ser.port, reason)
 
 def process_serial_data(ser, headdevice, bitunit, pymc3e, stop_event, logger):
     """Process incoming serial data."""
-    buffer = b""  # Buffer for binary data
+    buffer = bytearray()  # Buffer for binary data
     bit_active = False  # Track if the bit is currently active
     last_activation_time = 0  # Time of the last activation
+    last_target = None  # Weight currently held in the PLC words
+    port = ser.port
 
     while not stop_event.is_set():
-        if ser.in_waiting > 0:
-            data = ser.read(ser.in_waiting)
-            buffer += data
-
-            try:
-                decoded_data = buffer.decode('ascii')
-            except UnicodeDecodeError:
-                logger.error("Could not decode data: %s", buffer.hex())
-                buffer = b""  # Clear buffer on decode error
-                continue  
-
-            messages = decoded_data.split('\r\n')  # Split messages by line endings
+        # Block in read until at least one byte arrives or the port timeout
+        # expires, then take everything else already waiting, instead of polling
+        data = ser.read(ser.in_waiting or 1)
+        now = time.monotonic()  # Immune to wall-clock jumps; read once per pass
+        if data:
+            buffer.extend(data)
+
+            messages = _pop_frames(buffer, logger)  # Complete messages; a partial one stays buffered
             for message in messages:
-                cleaned_data = message.strip()
-
-                ##if cleaned_data and re.match(r'^ST,\+(\d{6}\.\d)\s*g$', cleaned_data):
-                ##    weight_str = re.match(r'^ST,\+(\d{6}\.\d)\s*g$', cleaned_data).group(1)
-                ##    print("weight_str1", weight_str)
-                if cleaned_data and re.match(r'^ST,\+(\d+\.\d+)\s+g$', cleaned_data):
-                    weight_str = re.match(r'^ST,\+(\d+\.\d+)\s+g$', cleaned_data).group(1)
+                target_value = _parse_weight(message)
 
-                    try:
-                        weight_value = float(weight_str)
-                        target_value = int(weight_value * 100)
-                        logger.info("Received weight data from %s: %s", ser.port, cleaned_data)
+                if target_value is not None:
+                    if logger.isEnabledFor(logging.INFO):  # Skip the decode when INFO is filtered
+                        logger.info("Received weight data from %s: %s", port, message.strip().decode("ascii"))
 
-                        # Write the split 16-bit values to the PLC
+                    # Write the split 16-bit values to the PLC, unless they are already there
+                    if target_value != last_target:
                         converted_values = utility.split_32bit_to_16bit(target_value)
                         ## print(target_value)
                         ## print(converted_values)
                         pymc3e.batchwrite_wordunits(headdevice=headdevice, values=converted_values)
+                        last_target = target_value
 
-                        # Activate bit unit if not already active
-                        if not bit_active:
-                            pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[1])
-                            bit_active = True  # Mark the bit as active
-                            logger.info("Bit unit activated")
-                        
-                        # Reset the last activation time for each signal received
-                        last_activation_time = time.time()
-                        logger.info("Last activation time reset")
-
-                    except ValueError:
-                        logger.error("Failed to convert weight data to float: %s", weight_str)
+                    # Activate bit unit if not already active
+                    if not bit_active:
+                        pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[1])
+                        bit_active = True  # Mark the bit as active
+                        logger.info("Bit unit activated")
 
-            buffer = b""  # Reset buf
+                    # Reset the last activation time for each signal received
+                    last_activation_time = now
 
         # Check if the bit should be set to false (0) after 10 seconds from the last activation
-        current_time = time.time()
-        if bit_active and (current_time - last_activation_time) >= 7:
+        if bit_active and (now - last_activation_time) >= 7:
             try:
                 pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[0])
                 bit_active = False  # Reset the bit status
@@ -66,72 +156,26 @@ def process_serial_data(ser, headdevice, bitunit, pymc3e, stop_event, logger):
             except pymc3e.mcprotocolerror.MCProtocolError as e:
                 logger.error("Failed to set bit to 0: %s", e)
 
-        time.sleep(0.1)  # Reduce CPU usage when no data is available
 
 def _smode_process_serial_data(ser, headdevice, bitunit, pymc3e, stop_event, logger):
-    """Process incoming streaming data from the weighing scale."""
-    buffer = b""  # Buffer for binary data
-    last_weight = 0  # Track the last largest weight
-    last_update_time = 0  # Time when the last weight update occurred
-
-    while not stop_event.is_set():
-        if ser.in_waiting > 0:
-            data = ser.read(ser.in_waiting)
-            buffer += data
-
-            try:
-                decoded_data = buffer.decode('ascii')
-            except UnicodeDecodeError:
-                logger.error("Could not decode data: %s", buffer.hex())
-                buffer = b""  # Clear buffer on decode error
-                continue  
-
-            messages = decoded_data.split('\r\n')  # Split messages by line endings
-            buffer = b""  # Reset buffer after splitting messages
-
-            for message in messages:
-                cleaned_data = message.strip()
-                if cleaned_data and re.match(r'^ST,\+(\d+\.\d+)\s+g$', cleaned_data):
-                    weight_str = re.match(r'^ST,\+(\d+\.\d+)\s+g$', cleaned_data).group(1)
-
-                    try:
-                        weight_value = float(weight_str)
-                        target_value = int(weight_value * 100)
-
-                        # Filter out weights lower than 100
-                        if target_value < 100:
-                            # logger.info("Filtered out weight data: %d (less than threshold).", target_value)
-                            continue
-
-                        if target_value > last_weight:
-                            # Update last_weight and write to PLC
-                            last_weight = target_value
-                            logger.info("Received weight data from %s: %s", ser.port, cleaned_data)
-                            converted_values = utility.split_32bit_to_16bit(last_weight)
-                            pymc3e.batchwrite_wordunits(headdevice=headdevice, values=converted_values)
-
-                            # Activate the bit unit
-                            pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[1])
-                            last_update_time = time.time()  # Reset the update time
-                            logger.info("Updated PLC with weight: %d and activated bit unit.", last_weight)
-
-                    except ValueError:
-                        logger.error("Failed to convert weight data to float: %s", weight_str)
-
-        # Check if the 20-second timeout has elapsed without a larger weight
-        current_time = time.time()
-        if last_update_time and (current_time - last_update_time) >= 10:
-            try:
-                # Reset the PLC data and bit unit
-                pymc3e.batchwrite_wordunits(headdevice=headdevice, values=[0, 0])
-                pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[0])
-                last_update_time = 0  # Reset the update time
-                logger.info("Reset PLC data and bit unit due to timeout.")
-                last_weight = 0 # Reset last weight
-            except pymc3e.mcprotocolerror.MCProtocolError as e:
-                logger.error("Failed to reset PLC data: %s", e)
+    """Process incoming streaming data from the weighing scale until stop_event is set.
 
-        time.sleep(0.01)  # Reduce CPU usage when no data is available
+    Blocking front end for one port; each pass is smode_process_serial_data, so
+    both share one implementation of the parsing, filtering and reset rules.
+    """
+    context = {
+        "ser": ser,
+        "headdevice": headdevice,
+        "bitunit": bitunit,
+        "pymc3e": pymc3e,
+        "logger": logger,
+        "state": PortState(ser.port, headdevice, bitunit, ser=ser),
+        "stop_event": stop_event,
+    }
+    while not stop_event.is_set() and ser.is_open:  # Closed once the port disconnects
+        # Wait for data; the timeout lets the reset fire while the scale is quiet
+        select.select([ser.fileno()], [], [], 1)
+        smode_process_serial_data(context)
 
 
 def smode_process_serial_data(context):
@@ -148,8 +192,14 @@ def smode_process_serial_data(context):
         - bitunit: The PLC bit unit to activate/deactivate.
         - pymc3e: The pymc3e connection object.
         - logger: Logger for logging messages.
-        - state: Dictionary to maintain function state across calls.
+        - state: The port's process.PortState, kept across calls.
         - stop_event: A threading Event to stop the worker.
+        - selector (optional): The selector the port's fd is registered with.
+          A port that hung up or fails with an I/O error is unregistered from
+          it and closed.
+        - writes (optional): A batch from process.new_write_batch(). When given,
+          PLC writes are collected there for the caller to send with
+          process.flush_writes() instead of being written immediately.
     """
     ser = context["ser"]
     headdevice = context["headdevice"]
@@ -158,60 +208,111 @@ def smode_process_serial_data(context):
     logger = context["logger"]
     state = context["state"]
     stop_event = context["stop_event"]
+    writes = context.get("writes")
 
     try:
         if stop_event.is_set():
             return  # Exit if the stop event is set
 
-        if ser.in_waiting > 0:
-            data = ser.read(ser.in_waiting)
-            state["buffer"] += data
+        # One non-blocking read takes everything the driver has queued. pyserial's
+        # in_waiting + read() would cost an ioctl, a select and a read per wakeup.
+        # readv fills the port's preallocated read_buf instead of a new bytes object.
+        try:
+            count = os.readv(ser.fileno(), [state.read_buf])
+        except BlockingIOError:
+            count = None  # Readiness was already consumed by an earlier read
+        except OSError as e:
+            _close_disconnected(context, e)  # EIO once the adapter is unplugged
+            return
+        if count == 0:
+            _close_disconnected(context, "end of file")  # Hangup on a readable fd
+            return
+
+        if count:
+            with memoryview(state.read_buf) as view:
+                state.buffer.extend(view[:count])
+
+            messages = _pop_frames(state.buffer, logger)  # Complete messages; a partial one stays buffered
 
-            try:
-                decoded_data = state["buffer"].decode('ascii')
-            except UnicodeDecodeError:
-                logger.error("Could not decode data: %s", state["buffer"].hex())
-                state["buffer"] = b""  # Clear buffer on decode error
-                return
+            for message in messages:
+                target_value = _parse_weight(message)
+                if target_value is not None:
+                    if target_value < 100:
+                        continue  # Filter out weights lower than 100
+
+                    if target_value > state.last_weight:
+                        state.last_weight = target_value
+                        if logger.isEnabledFor(logging.INFO):  # Skip the decode when INFO is filtered
+                            logger.info("Received weight data from %s: %s", ser.port, message.strip().decode("ascii"))
+                        converted_values = utility.split_32bit_to_16bit(state.last_weight)
+                        if writes is None:
+                            pymc3e.batchwrite_wordunits(headdevice=headdevice, values=converted_values)
+                            pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[1])
+                        else:
+                            writes["words"][headdevice] = converted_values
+                            writes["bits"][bitunit] = 1
+                        state.last_update_time = time.monotonic()
+                        logger.info("Updated PLC with weight: %d and activated bit unit.", state.last_weight)
 
-            messages = decoded_data.split('\r\n')  # Split messages by line endings
-            state["buffer"] = b""  # Reset buffer after splitting messages
+        smode_reset_on_timeout(context)
 
-            for message in messages:
-                cleaned_data = message.strip()
-                if cleaned_data and re.match(r'^ST,\+(\d+\.\d+)\s+g$', cleaned_data):
-                    weight_str = re.match(r'^ST,\+(\d+\.\d+)\s+g$', cleaned_data).group(1)
+    except Exception as e:
+        logger.error("Error in processing serial data: %s", e)
 
-                    try:
-                        weight_value = float(weight_str)
-                        target_value = int(weight_value * 100)
 
-                        if target_value < 100:
-                            continue  # Filter out weights lower than 100
+def smode_reset_on_timeout(context):
+    """
+    Reset the port's PLC data and bit unit once no larger weight arrived for 10 seconds.
 
-                        if target_value > state["last_weight"]:
-                            state["last_weight"] = target_value
-                            logger.info("Received weight data from %s: %s", ser.port, cleaned_data)
-                            converted_values = utility.split_32bit_to_16bit(state["last_weight"])
-                            pymc3e.batchwrite_wordunits(headdevice=headdevice, values=converted_values)
+    smode_process_serial_data runs this after every read. A port that went
+    quiet is never read, so the caller must also run it periodically to make
+    the reset happen on time.
 
-                            pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[1])
-                            state["last_update_time"] = time.time()
-                            logger.info("Updated PLC with weight: %d and activated bit unit.", state["last_weight"])
+    Parameters
+    ----------
+    context : dict
+        The same dictionary smode_process_serial_data takes; only headdevice,
+        bitunit, pymc3e, logger, state and the optional writes are used.
+    """
+    state = context["state"]
+    if not state.last_update_time or (time.monotonic() - state.last_update_time) < _RESET_TIMEOUT:
+        return
 
-                    except ValueError:
-                        logger.error("Failed to convert weight data to float: %s", weight_str)
+    headdevice = context["headdevice"]
+    bitunit = context["bitunit"]
+    pymc3e = context["pymc3e"]
+    logger = context["logger"]
+    writes = context.get("writes")
+    try:
+        if writes is None:
+            pymc3e.batchwrite_wordunits(headdevice=headdevice, values=[0, 0])
+            pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[0])
+        else:
+            writes["words"][headdevice] = [0, 0]
+            writes["bits"][bitunit] = 0
+        state.last_update_time = 0
+        state.last_weight = 0
+        logger.info("Reset PLC data and bit unit due to timeout.")
+    except pymc3e.mcprotocolerror.MCProtocolError as e:
+        logger.error("Failed to reset PLC data: %s", e)
+
+
+def smode_reset_delay(context):
+    """
+    Return the seconds until smode_reset_on_timeout will reset the port.
 
-        current_time = time.time()
-        if state["last_update_time"] and (current_time - state["last_update_time"]) >= 10:
-            try:
-                pymc3e.batchwrite_wordunits(headdevice=headdevice, values=[0, 0])
-                pymc3e.batchwrite_bitunits(headdevice=bitunit, values=[0])
-                state["last_update_time"] = 0
-                state["last_weight"] = 0
-                logger.info("Reset PLC data and bit unit due to timeout.")
-            except pymc3e.mcprotocolerror.MCProtocolError as e:
-                logger.error("Failed to reset PLC data: %s", e)
+    Parameters
+    ----------
+    context : dict
+        The same dictionary smode_process_serial_data takes; only state is used.
 
-    except Exception as e:
-        logger.error("Error in processing serial data: %s", e)
+    Returns
+    -------
+    float or None
+        The remaining time, 0 if the reset is already due, or None if nothing
+        is pending a reset.
+    """
+    state = context["state"]
+    if not state.last_update_time:
+        return None
+    return max(0.0, state.last_update_time + _RESET_TIMEOUT - time.monotonic())
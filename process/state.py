@@ -0,0 +1,42 @@
+class PortState:
+    """
+    Everything the monitor and the workers track for one serial port.
+
+    Attributes
+    ----------
+    port : str
+        The serial port name, e.g. "/dev/ttyUSB0".
+
+    headdevice : str
+        The PLC head device to write weight data to.
+
+    bitunit : str
+        The PLC bit unit to activate/deactivate.
+
+    ser : serial.Serial or None
+        The open serial port, or None if it could not be opened.
+
+    buffer : bytearray
+        Received bytes after the last complete frame, kept until the rest arrives.
+
+    read_buf : bytearray
+        Preallocated scratch space each read from the port lands in, so reading
+        does not allocate a new bytes object every time.
+
+    last_weight : int
+        The largest weight written to the PLC since the last reset.
+
+    last_update_time : float
+        time.monotonic() when last_weight was written, or 0 if nothing is pending a reset.
+    """
+    __slots__ = ("port", "headdevice", "bitunit", "ser", "buffer", "read_buf", "last_weight", "last_update_time")
+
+    def __init__(self, port, headdevice, bitunit, ser=None, read_size=4096):
+        self.port = port
+        self.headdevice = headdevice
+        self.bitunit = bitunit
+        self.ser = ser
+        self.buffer = bytearray()
+        self.read_buf = bytearray(read_size)
+        self.last_weight = 0
+        self.last_update_time = 0
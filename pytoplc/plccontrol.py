@@ -1,8 +1,11 @@
 
 import pymcprotocol
 
-#Qシリーズがデフォルトです
-pymc3e = pymcprotocol.Type3E()
+PLC_IP = "192.168.3.61"
+PLC_PORT = 5014
+
+_pymc3e = None
+
 """
 Qシリーズ以外の場合はインスタンス化にplctypeを与えてください
 
@@ -13,12 +16,18 @@ pymc3e = pymcprotocol.Type3E(plctype="QnA")
 pymc3e = pymcprotocol.Type3E(plctype="iQ-L")
 """
 
-
-#イーサネットの接続形式をASCIIにした場合はここで"ascii"を与えてください
-#もしMCプロトコルのアクセス経路をデフォルトから変更する場合もこのメソッドから可能です.
-# pymc3e.setaccessopt(commtype="ascii")
-#PLCに設定したIPアドレス, MCプロトコル用ポートに接続
-pymc3e.connect("192.168.3.61", 5014)
+def get_client():
+    """Return the PLC connection, connecting on first use instead of at import."""
+    global _pymc3e
+    if _pymc3e is None:
+        #Qシリーズがデフォルトです
+        _pymc3e = pymcprotocol.Type3E()
+        #イーサネットの接続形式をASCIIにした場合はここで"ascii"を与えてください
+        #もしMCプロトコルのアクセス経路をデフォルトから変更する場合もこのメソッドから可能です.
+        # _pymc3e.setaccessopt(commtype="ascii")
+        #PLCに設定したIPアドレス, MCプロトコル用ポートに接続
+        _pymc3e.connect(PLC_IP, PLC_PORT)
+    return _pymc3e
 
 def convert_to_base256(value):
     """Breaks down the target_value into an array where each element represents a byte (base 256).
@@ -29,26 +38,18 @@ def convert_to_base256(value):
     Returns:
         list of int: The base256 representation of the number.
     """
-    base256 = []
-    while value > 0:
-        base256.append(value % 256)
-        value //= 256
-    base256.reverse()  # Reverse to get the correct order
-    return base256
+    if value <= 0:
+        return []  # Zero and negative values have no base-256 digits
+    # int.to_bytes runs the divide-by-256 loop in C, most significant byte first
+    return list(value.to_bytes((value.bit_length() + 7) // 8, "big"))
 
 def convert_to_32bit(value):
     """Converts a given integer to its 32-bit representation (4 bytes)."""
     if value < 0 or value > 0xFFFFFFFF:
         raise ValueError("Value out of range for 32-bit conversion")
     
-    # Convert to 4 bytes (32 bits)
-    base256 = [
-        (value >> 24) & 0xFF,  # Most significant byte
-        (value >> 16) & 0xFF,
-        (value >> 8) & 0xFF,
-        value & 0xFF           # Least significant byte
-    ]
-    return base256
+    # Convert to 4 bytes (32 bits), most significant byte first
+    return list(value.to_bytes(4, "big"))
 
 def split_32bit_to_16bit(value):
     """Splits a 32-bit integer into two 16-bit words.
@@ -77,11 +78,13 @@ def split_32bit_to_16bit(value):
 # 
 #D10からD15まで与えた数値を書き込み
 # Example usage:
-target_value = 0
-converted_values = split_32bit_to_16bit(target_value)
-print(f"Converted values (32-bit split into 16-bit): {converted_values}")
-# Write the split 16-bit values to the PLC
-pymc3e.batchwrite_wordunits(headdevice="D6564", values=converted_values)
+if __name__ == "__main__":
+    pymc3e = get_client()
+    target_value = 0
+    converted_values = split_32bit_to_16bit(target_value)
+    print(f"Converted values (32-bit split into 16-bit): {converted_values}")
+    # Write the split 16-bit values to the PLC
+    pymc3e.batchwrite_wordunits(headdevice="D6564", values=converted_values)
 # 
 # #Y10からY15まで与えた数値を書き込み(ビットデバイスアクセス)
 # pymc3e.batchwrite_bitunits(headdevice="M3300", values=[1])
@@ -0,0 +1,78 @@
+"""
+Test code for the PLC connection helpers
+"""
+
+from unittest import mock
+import sys
+import os
+import socket
+import time
+import pytest
+
+# Add parent directory to Python path so that "connect" can be imported
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import connect
+
+@pytest.fixture
+def logger_mock():
+    """Mock logger so that tests can inspect the logged messages."""
+    return mock.Mock()
+
+@pytest.fixture
+def listening_port():
+    """Open a local TCP port standing in for the PLC's MC protocol port."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    yield server.getsockname()[1]
+    server.close()
+
+def test_ping_host_tcp_probe_success(listening_port, logger_mock):
+    """A port that accepts the connection is reported as reachable."""
+    assert connect.ping_host("127.0.0.1", logger_mock, port=listening_port)
+    logger_mock.error.assert_not_called()
+
+def test_ping_host_tcp_probe_timeout(logger_mock, monkeypatch):
+    """A probe that times out is reported as unreachable."""
+    monkeypatch.setattr(connect.connect.socket, "create_connection", mock.Mock(side_effect=socket.timeout("timed out")))
+    assert not connect.ping_host("192.0.2.1", logger_mock, port=5014)
+    logger_mock.error.assert_called_once()
+
+def test_check_connection_reuses_result_within_ttl(logger_mock, monkeypatch):
+    """Only one probe is sent while the cached verdict is still fresh."""
+    probe = mock.Mock(return_value=True)
+    monkeypatch.setattr(connect.connect, "ping_host", probe)
+    monkeypatch.setitem(connect.connect._last_check, "ts", float("-inf"))
+    monkeypatch.setitem(connect.connect._last_check, "ok", False)
+
+    for _ in range(5):
+        assert connect.check_connection(None, "192.0.2.1", 5014, logger_mock, check_ttl=60)
+    probe.assert_called_once_with("192.0.2.1", logger_mock, port=5014)
+
+def test_check_connection_peeks_live_socket(logger_mock, monkeypatch):
+    """An open MC protocol socket answers the check without probing the network."""
+    probe = mock.Mock(return_value=True)
+    monkeypatch.setattr(connect.connect, "ping_host", probe)
+    monkeypatch.setitem(connect.connect._last_check, "ts", float("-inf"))
+    monkeypatch.setitem(connect.connect._last_check, "ok", False)
+
+    local, remote = socket.socketpair()
+    local.settimeout(2)  # As pymcprotocol sets on its socket
+    pymc3e = mock.Mock(_sock=local, _is_connected=True)
+    started = time.monotonic()
+    assert connect.check_connection(pymc3e, "192.0.2.1", 5014, logger_mock, check_ttl=0)
+    assert time.monotonic() - started < 0.5  # An idle socket must not wait out its timeout
+
+    remote.close()
+    assert not connect.check_connection(pymc3e, "192.0.2.1", 5014, logger_mock, check_ttl=0)
+    probe.assert_not_called()
+    local.close()
+
+def test_reconnect_reuses_client(logger_mock):
+    """reconnect reopens the same client object at the address it was connected to."""
+    pymc3e = mock.Mock(_ip="192.0.2.1", _port=5014)
+    pymc3e.close.side_effect = OSError("already closed")
+
+    connect.reconnect(pymc3e, logger_mock)
+
+    pymc3e.connect.assert_called_once_with("192.0.2.1", 5014)
@@ -0,0 +1,240 @@
+"""
+Test code for the serial data processing helpers
+"""
+
+from unittest import mock
+import sys
+import os
+import pty
+import selectors
+import time
+import pytest
+import pymcprotocol
+
+# Add parent directory to Python path so that "process" can be imported
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import process
+
+@pytest.fixture
+def pymc3e_mock():
+    """Mock PLC connection that records the MC protocol calls."""
+    return mock.MagicMock(spec=pymcprotocol.Type3E)
+
+def test_flush_writes_coalesces_ports(pymc3e_mock):
+    """Writes from several ports go out as one word frame and one bit frame."""
+    writes = process.new_write_batch()
+    writes["words"]["D6364"] = [12345, 0]
+    writes["words"]["D6464"] = [0xFFFF, 0xFFFF]
+    writes["bits"]["M3300"] = 1
+    writes["bits"]["M3400"] = 0
+
+    process.flush_writes(pymc3e_mock, writes)
+
+    pymc3e_mock.randomwrite.assert_called_once_with(
+        word_devices=[], word_values=[], dword_devices=["D6364", "D6464"], dword_values=[12345, -1])
+    pymc3e_mock.randomwrite_bitunits.assert_called_once_with(bit_devices=["M3300", "M3400"], values=[1, 0])
+    assert writes == process.new_write_batch()
+
+def test_flush_writes_empty_batch(pymc3e_mock):
+    """An empty batch does not talk to the PLC at all."""
+    process.flush_writes(pymc3e_mock, process.new_write_batch())
+    assert pymc3e_mock.mock_calls == []
+
+@pytest.mark.parametrize("frame, expected", [
+    (b"ST,+000123.45  g", 12345),
+    (b"ST,+000000.29 g\r", 29),
+    (b"ST,+000123.4 g", 12340),
+    (b"ST,+000123.456 g", 12345),
+    (b"US,+000123.45  g", None),
+    (b"ST,-000123.45  g", None),
+    (b"ST,+000123.45g", None),
+    (b"ST,+000123  g", None),
+    (b"ST,+0001\xff3.45  g", None),
+    (b"", None),
+])
+def test_parse_weight(frame, expected):
+    """Stable readings are returned in hundredths; anything else is rejected."""
+    assert process.serial._parse_weight(frame) == expected
+
+def test_parse_weight_caches_repeated_frames():
+    """A steady scale repeating its frame is parsed once."""
+    process.serial._parse_weight.cache_clear()
+    for _ in range(3):
+        assert process.serial._parse_weight(b"ST,+000123.45  g") == 12345
+    assert process.serial._parse_weight.cache_info().hits == 2
+
+def test_pop_frames_keeps_partial_frame():
+    """A frame split across two reads is parsed once its terminator arrives."""
+    logger = mock.Mock()
+    buffer = bytearray(b"ST,+000001.00  g\r\nST,+0000")
+    assert process.serial._pop_frames(buffer, logger) == [b"ST,+000001.00  g"]
+    assert buffer == b"ST,+0000"
+
+    buffer.extend(b"02.00  g\r\n")
+    assert process.serial._pop_frames(buffer, logger) == [b"ST,+000002.00  g"]
+    assert buffer == b""
+    logger.error.assert_not_called()
+
+def test_disconnected_port_is_unregistered_and_closed(pymc3e_mock):
+    """A tty whose other end went away is taken out of the selector and closed, not spun on."""
+    master, slave = pty.openpty()
+    os.close(master)  # Reading the slave now fails with EIO, as with an unplugged adapter
+    ser = mock.Mock(port="/dev/ttyUSB0", **{"fileno.return_value": slave})
+    selector = selectors.DefaultSelector()
+    selector.register(slave, selectors.EVENT_READ)
+    logger = mock.Mock()
+    context = {"ser": ser, "headdevice": "D6364", "bitunit": "M3300", "pymc3e": pymc3e_mock,
+               "logger": logger, "state": process.PortState("/dev/ttyUSB0", "D6364", "M3300", ser=ser),
+               "stop_event": mock.Mock(**{"is_set.return_value": False}), "selector": selector}
+
+    try:
+        assert selector.select(timeout=0)  # A hung-up tty stays readable
+        process.smode_process_serial_data(context)
+
+        assert selector.get_map() == {}
+        ser.close.assert_called_once_with()
+        logger.error.assert_called_once()
+        assert pymc3e_mock.mock_calls == []
+    finally:
+        selector.close()
+        os.close(slave)
+
+def test_plc_writer_merges_pending_batches(pymc3e_mock):
+    """Batches submitted before the writer runs go out as one frame, newest value winning."""
+    stop_event = mock.Mock(**{"is_set.return_value": True})
+    writer = process.PlcWriter(pymc3e_mock, mock.Mock(), stop_event)
+    writer.submit({"words": {"D6364": [100, 0]}, "bits": {"M3300": 1}})
+    writer.submit({"words": {"D6364": [150, 0], "D6464": [200, 0]}, "bits": {"M3300": 1, "M3400": 1}})
+
+    writer.run()
+
+    pymc3e_mock.randomwrite.assert_called_once_with(
+        word_devices=[], word_values=[], dword_devices=["D6364", "D6464"], dword_values=[150, 200])
+    pymc3e_mock.randomwrite_bitunits.assert_called_once_with(bit_devices=["M3300", "M3400"], values=[1, 1])
+
+def test_plc_writer_keeps_bit_edges(pymc3e_mock):
+    """A bit that changes while an earlier value is pending is sent in order, not merged away."""
+    stop_event = mock.Mock(**{"is_set.return_value": True})
+    writer = process.PlcWriter(pymc3e_mock, mock.Mock(), stop_event)
+    writer.submit({"words": {"D6364": [0, 0]}, "bits": {"M3300": 0}})
+    writer.submit({"words": {"D6364": [100, 0]}, "bits": {"M3300": 1}})
+
+    writer.run()
+
+    assert pymc3e_mock.randomwrite_bitunits.call_args_list == [
+        mock.call(bit_devices=["M3300"], values=[0]),
+        mock.call(bit_devices=["M3300"], values=[1]),
+    ]
+    assert pymc3e_mock.randomwrite.call_args.kwargs["dword_values"] == [100]
+
+def test_reset_on_timeout_clears_quiet_port(pymc3e_mock):
+    """A port without a larger weight for 10 seconds has its PLC data reset."""
+    state = process.PortState("/dev/ttyUSB0", "D6364", "M3300")
+    state.last_weight = 12345
+    state.last_update_time = time.monotonic() - 11
+    writes = process.new_write_batch()
+    context = {"headdevice": "D6364", "bitunit": "M3300", "pymc3e": pymc3e_mock,
+               "logger": mock.Mock(), "state": state, "writes": writes}
+
+    process.smode_reset_on_timeout(context)
+
+    assert writes == {"words": {"D6364": [0, 0]}, "bits": {"M3300": 0}}
+    assert state.last_weight == 0 and state.last_update_time == 0
+
+def test_reset_delay_counts_down_to_reset():
+    """The delay is None while idle and shrinks towards 0 after a weight is written."""
+    state = process.PortState("/dev/ttyUSB0", "D6364", "M3300")
+    context = {"state": state}
+    assert process.smode_reset_delay(context) is None
+
+    state.last_update_time = time.monotonic() - 4
+    assert 5 < process.smode_reset_delay(context) <= 6
+
+    state.last_update_time = time.monotonic() - 11
+    assert process.smode_reset_delay(context) == 0
+
+def test_plc_writer_reconnects_and_retries(pymc3e_mock):
+    """A write that hits a dead socket is retried once after reconnecting."""
+    stop_event = mock.Mock(**{"is_set.return_value": True})
+    reconnect = mock.Mock()
+    pymc3e_mock.randomwrite.side_effect = [BrokenPipeError(32, "Broken pipe"), None]
+    writer = process.PlcWriter(pymc3e_mock, mock.Mock(), stop_event, reconnect=reconnect)
+    writer.submit({"words": {"D6364": [100, 0]}, "bits": {"M3300": 1}})
+
+    writer.run()
+
+    reconnect.assert_called_once_with()
+    assert pymc3e_mock.randomwrite.call_count == 2
+    pymc3e_mock.randomwrite_bitunits.assert_called_once_with(bit_devices=["M3300"], values=[1])
+
+def test_plc_writer_keeps_reconnecting_after_a_failed_reconnect(pymc3e_mock):
+    """A PLC that refuses the first reconnect still gets this batch and later ones."""
+    stop_event = mock.Mock(**{"is_set.return_value": False, "wait.return_value": False})
+    reconnect = mock.Mock(side_effect=[ConnectionRefusedError(111, "Connection refused"), None, None])
+    pymc3e_mock.randomwrite.side_effect = [BrokenPipeError(32, "Broken pipe"), None, None]
+    writer = process.PlcWriter(pymc3e_mock, mock.Mock(), stop_event, reconnect=reconnect)
+
+    writer.submit({"words": {"D6364": [100, 0]}, "bits": {}})
+    writer._flush()
+    assert reconnect.call_count == 2
+    stop_event.wait.assert_called_once()  # Backed off before the second reconnect
+
+    # pymcprotocol marks itself as not connected when its socket is closed
+    pymc3e_mock._is_connected = False
+    writer.submit({"words": {"D6364": [200, 0]}, "bits": {}})
+    writer._flush()
+    assert reconnect.call_count == 3
+    assert pymc3e_mock.randomwrite.call_count == 3
+    assert pymc3e_mock.randomwrite.call_args.kwargs["dword_values"] == [200]
+
+def test_plc_writer_collapses_a_backed_up_queue(pymc3e_mock):
+    """Once max_pending batches are queued they are merged, keeping the latest value per device."""
+    stop_event = mock.Mock(**{"is_set.return_value": True})
+    writer = process.PlcWriter(pymc3e_mock, mock.Mock(), stop_event, max_pending=2)
+    for value in range(5):
+        writer.submit({"words": {"D6364": [value, 0]}, "bits": {"M3300": value % 2}})
+    assert len(writer._pending) <= 2
+
+    writer.run()
+
+    assert pymc3e_mock.randomwrite.call_args.kwargs["dword_values"] == [4]
+    assert pymc3e_mock.randomwrite_bitunits.call_args == mock.call(bit_devices=["M3300"], values=[0])
+
+def test_plc_writer_drops_a_batch_the_plc_rejects(pymc3e_mock):
+    """An MC protocol error reply is logged and the batch dropped without reconnecting."""
+    stop_event = mock.Mock(**{"is_set.return_value": True})
+    reconnect = mock.Mock()
+    logger = mock.Mock()
+    pymc3e_mock.randomwrite.side_effect = pymcprotocol.mcprotocolerror.MCProtocolError(0xC051)
+    writer = process.PlcWriter(pymc3e_mock, logger, stop_event, reconnect=reconnect)
+    writer.submit({"words": {"D6364": [100, 0]}, "bits": {}})
+
+    writer.run()
+
+    reconnect.assert_not_called()
+    assert pymc3e_mock.randomwrite.call_count == 1
+    logger.error.assert_called_once()
+
+def test_plc_writer_gives_up_after_max_retries(pymc3e_mock):
+    """A PLC that stays closed costs one batch, not the writer; the next batch is sent."""
+    stop_event = mock.Mock(**{"is_set.return_value": False, "wait.return_value": False})
+    reconnect = mock.Mock()  # Returns, but the connection stays closed
+    # pymcprotocol refuses to write once its socket is closed
+    pymc3e_mock._is_connected = False
+    pymc3e_mock.randomwrite.side_effect = Exception("socket is not connected. Please use connect method")
+    logger = mock.Mock()
+    writer = process.PlcWriter(pymc3e_mock, logger, stop_event, reconnect=reconnect, max_retries=2)
+
+    writer.submit({"words": {"D6364": [100, 0]}, "bits": {}})
+    writer._flush()
+    assert reconnect.call_count == 3
+    assert pymc3e_mock.randomwrite.call_count == 3
+    logger.error.assert_called_once()
+
+    pymc3e_mock._is_connected = True
+    pymc3e_mock.randomwrite.side_effect = None
+    writer.submit({"words": {"D6364": [200, 0]}, "bits": {}})
+    writer._flush()
+    assert pymc3e_mock.randomwrite.call_count == 4
+    assert pymc3e_mock.randomwrite.call_args.kwargs["dword_values"] == [200]
+    logger.error.assert_called_once()
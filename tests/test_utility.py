@@ -0,0 +1,59 @@
+"""
+Test code for the serial port helpers
+"""
+
+from unittest import mock
+import sys
+import os
+
+# Add parent directory to Python path so that "utility" can be imported
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import utility
+
+def test_monitor_serial_ports_backs_off_then_stops():
+    """A port that cannot be reopened is retried with growing waits before the monitor gives up."""
+    ser = mock.Mock(is_open=False)
+    ser.open.side_effect = OSError(2, "No such file or directory")
+    stop_event = mock.Mock(**{"is_set.return_value": False, "wait.return_value": False})
+
+    with mock.patch("utility.retry.random.random", return_value=1.0):  # Take the top of the jitter range
+        utility.monitor_serial_ports({"/dev/ttyUSB0": ser}, stop_event, max_failures=3)
+
+    assert ser.open.call_count == 3
+    # Backoff waits of 2 s and 4 s, each followed by the regular 1 s check interval
+    assert stop_event.wait.call_args_list == [mock.call(2), mock.call(1), mock.call(4), mock.call(1)]
+    stop_event.set.assert_called_once_with()
+
+def test_monitor_serial_ports_opens_a_port_missing_at_startup():
+    """A port that failed to open at startup gets a new serial object with the given settings."""
+    serial_ports = {"/dev/ttyUSB0": None}
+    stop_event = mock.Mock(**{"is_set.side_effect": [False, True]})
+    ser = mock.Mock(is_open=True)
+
+    with mock.patch("utility.initialserial.serial.Serial", return_value=ser) as serial_cls, \
+            mock.patch("utility.initialserial.send_ping_token", return_value=True):
+        utility.monitor_serial_ports(serial_ports, stop_event, baudrate=9600, low_latency=False)
+
+    assert serial_ports == {"/dev/ttyUSB0": ser}
+    assert serial_cls.call_args.kwargs["port"] == "/dev/ttyUSB0"
+    assert serial_cls.call_args.kwargs["baudrate"] == 9600
+    ser.set_low_latency_mode.assert_not_called()
+
+def test_send_ping_token_reads_the_whole_reply():
+    """A reply arriving in pieces is read in buffered chunks until its newline."""
+    read_fd, write_fd = os.pipe()
+    chunks = [b"ST,+000", b"123.45  g\r\n"]
+    ser = mock.Mock(**{"fileno.return_value": read_fd, "in_waiting": 0})
+
+    def read(size):
+        os.write(write_fd, b"x")  # Keep the fd readable for the next select
+        return chunks.pop(0)
+    ser.read.side_effect = read
+    os.write(write_fd, b"x")
+
+    try:
+        assert utility.initialserial.send_ping_token(ser, reply_timeout=1)
+        assert ser.read.call_count == 2
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
@@ -1,3 +1,4 @@
+import signal
 import pigpio
 
 # Replace with the GPIO pin you want to use for RXD
@@ -14,14 +15,46 @@ if not pi.connected:
 pi.set_mode(RX_PIN, pigpio.INPUT)  # Set RX_PIN as input
 pi.bb_serial_read_open(RX_PIN, 9600)  # Open the pin for serial reading at 9600 baud rate
 
+# Milliseconds without an edge after which a burst counts as finished; at 9600
+# baud one character takes about 1 ms, so this outlasts any gap inside a frame
+IDLE_MS = 5
+
+rx_pending = False  # Edges were seen since the last read, and the watchdog is armed
+
+def on_rx(gpio, level, tick):
+    """Note edges on RX_PIN and read the collected bytes once the line has gone idle.
+
+    pigpiod still reports every edge to this callback, but an edge only sets a
+    flag; just the first edge of a burst makes a round trip, to arm the
+    watchdog. The watchdog fires IDLE_MS after the last edge, when the whole
+    frame including its stop bit and CRLF has been received. That tick turns
+    the watchdog off again and does the single read, so an idle line costs
+    no wakeups at all.
+    """
+    global rx_pending
+    if level != pigpio.TIMEOUT:
+        if not rx_pending:
+            rx_pending = True
+            pi.set_watchdog(gpio, IDLE_MS)  # Watch for the end of this burst
+        return
+    if not rx_pending:
+        return  # A timeout that was already queued when the watchdog was turned off
+    rx_pending = False
+    pi.set_watchdog(gpio, 0)  # 0 turns the watchdog off until the next burst
+    (count, data) = pi.bb_serial_read(gpio)  # Read data from the software RX pin
+    if count > 0:
+        print("Received:", data.decode("utf-8", errors="ignore"))
+
+# Wake up on line changes and on the end of a burst instead of polling bb_serial_read
+cb = pi.callback(RX_PIN, pigpio.EITHER_EDGE, on_rx)
+
 try:
-    while True:
-        (count, data) = pi.bb_serial_read(RX_PIN)  # Read data from the software RX pin
-        if count > 0:
-            print("Received:", data.decode("utf-8", errors="ignore"))
+    signal.pause()
 except KeyboardInterrupt:
     print("Stopping serial read")
 
 # Clean up
+pi.set_watchdog(RX_PIN, 0)  # In case a burst was still being received
+cb.cancel()
 pi.bb_serial_read_close(RX_PIN)
 pi.stop()
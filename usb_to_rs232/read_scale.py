@@ -1,3 +1,7 @@
+import fcntl
+import logging
+import os
+import select
 import serial
 
 # Set up serial communication on the correct serial port
@@ -17,6 +21,9 @@ Stop bits option: 1, 1.5 or 2
 """
 stopbits = serial.STOPBITS_ONE  # Stop bits (1 stop bit)
 
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+log = logging.getLogger("read_scale")
+
 try:
     # Initialize serial connection
     ser = serial.Serial(
@@ -27,41 +34,64 @@ try:
         stopbits=stopbits,
         timeout=1
     )
-    print(f"Opened serial port {dev} successfully. Listening for data...")
+    log.info("Opened serial port %s successfully. Listening for data...", dev)
+    try:
+        # Have the USB serial driver pass bytes on at once instead of after its latency timer
+        ser.set_low_latency_mode(True)
+    except (AttributeError, ValueError, NotImplementedError) as e:  # pyserial implements it on Linux only
+        log.warning("Could not enable low latency mode on %s: %s", dev, e)
+    # Make sure reads never block so the loop can call os.read directly
+    fd = ser.fileno()
+    fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
 
-    buffer = b""  # Use a byte buffer for binary data
+    buffer = bytearray()  # Use a byte buffer for binary data, grown in place
+    search_start = 0  # Bytes before this were already scanned for the CRLF terminator
 
     while True:
-        if ser.in_waiting > 0:  # Check if there is data waiting in the buffer
-            data = ser.read(ser.in_waiting)
-            buffer += data  # Append binary data to buffer
+        # Sleep in the kernel until the port is readable
+        select.select([fd], [], [])
+        try:
+            data = os.read(fd, 4096)  # Read everything available in one syscall
+        except BlockingIOError:
+            continue  # Nothing waiting after all
+        if not data:
+            # A readable fd with nothing to read means the device hung up
+            raise serial.SerialException("device disconnected")
+        buffer.extend(data)  # Append binary data to buffer
+
+        # Raw and hex format for debugging; hex() walks the whole buffer, so only when enabled
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Raw data received: %r", data)
+            log.debug("Buffer in hex format: %s", buffer.hex())
 
-            # Print raw and hex format for debugging
-            print(f"Raw data received: {data}")
-            print(f"Buffer in hex format: {buffer.hex()}")
+        # Handle every complete frame; a partial one after the last CRLF stays buffered
+        end = buffer.find(b'\r\n', search_start)
+        while end >= 0:
+            frame = bytes(buffer[:end])
+            del buffer[:end + 2]
+            try:
+                # Decode frame to ASCII and strip whitespace
+                decoded_data = frame.decode('ascii').strip()
+                log.info("Received weight data: %s", decoded_data)
 
-            # Check if the buffer contains the CRLF terminator
-            if b'\r\n' in buffer:
-                try:
-                    # Decode buffer to ASCII and strip terminators
-                    decoded_data = buffer.decode('ascii').strip()
-                    print(f"Received weight data: {decoded_data}")
+                # Check if the weight data ends with 'g' and remove it
+                if decoded_data.endswith('g'):
+                    weight_data = decoded_data.rstrip('g').strip()
+                    log.info("Extracted weight data: %s", weight_data)
+                    # Process or publish the weight_data as needed
 
-                    # Check if the weight data ends with 'g' and remove it
-                    if decoded_data.endswith('g'):
-                        weight_data = decoded_data.rstrip('g').strip()
-                        print(f"Extracted weight data: {weight_data}")
-                        # Process or publish the weight_data as needed
+            except UnicodeDecodeError:
+                log.warning("Could not decode data: %s", frame.hex())
 
-                except UnicodeDecodeError:
-                    print(f"Could not decode data: {buffer.hex()}")
+            end = buffer.find(b'\r\n')
 
-                buffer = b""  # Clear buffer after processing data
+        # Only the last byte could be the start of a terminator split across reads
+        search_start = max(0, len(buffer) - 1)
 
-except serial.SerialException as e:
-    print(f"Serial error: {e}")
+except (serial.SerialException, OSError) as e:  # OSError: EIO from os.read on an unplugged adapter
+    log.error("Serial error: %s", e)
 except Exception as e:
-    print(f"Unexpected error: {e}")
+    log.error("Unexpected error: %s", e)
 finally:
     ser.close()
-    print("Serial connection closed.")
\ No newline at end of file
+    log.info("Serial connection closed.")
\ No newline at end of file
@@ -1,3 +1,5 @@
+import fcntl
+import os
 import serial
 import time
 
@@ -12,27 +14,34 @@ def initialize_serial():
         print(f"Serial port {SERIAL_PORT} opened successfully at {BAUD_RATE} baud rate.")
     else:
         print(f"Failed to open serial port {SERIAL_PORT}.")
+    # Make sure reads never block so read_scale_data can call os.read directly
+    fd = ser.fileno()
+    fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
     return ser
 
-def read_scale_data(ser):
-    """Read and print data from the serial port."""
-    weight = ""
-    while ser.in_waiting > 0:
-        char = ser.read().decode('ascii', errors='ignore') 
-        if char == '\n':
-            print(f"Weight: {weight}")
-            weight = ""  # Reset for next reading
-        else:
-            weight += char
+def read_scale_data(ser, residual=b""):
+    """Read and print data from the serial port.
+
+    Returns the trailing partial line so the caller can pass it back in.
+    """
+    try:
+        buf = os.read(ser.fileno(), 4096)  # Read everything available in one syscall
+    except BlockingIOError:
+        return residual  # Nothing waiting
+    *lines, residual = (residual + buf).split(b'\n')
+    for line in lines:
+        print(f"Weight: {line.decode('ascii', errors='ignore')}")
+    return residual
 
 if __name__ == "__main__":
     # Initialize Serial Communication
     ser = initialize_serial()
 
     try:
+        residual = b""
         while True:
             # Read data from the scale
-            read_scale_data(ser)
+            residual = read_scale_data(ser, residual)
             time.sleep(0.1)  # Adjust sleep as needed for reading frequency
 
     except KeyboardInterrupt:
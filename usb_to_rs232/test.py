@@ -9,5 +9,4 @@ ser = serial.Serial(dev, rate, timeout=10)
 # ser.write(string)    #    コマンド送信
 
 res = ser.readline()    #    コマンド受信
-res = res.encode()    #    エンコード
 print(res)
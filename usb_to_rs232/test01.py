@@ -1,3 +1,5 @@
+import os
+import select
 import serial
 
 dev = "/dev/serial0"  # Device name
@@ -19,14 +21,22 @@ try:
     print(f"Opened serial port {dev} successfully. Listening for data...")
 
     # Continuous listening loop
+    residual = b""
     while True:
-        # Read data from serial port
-        res = ser.readline()
-        if res:  # If data is received
+        # Block until the port is readable, then take everything buffered in one syscall
+        select.select([ser.fileno()], [], [])
+        try:
+            data = os.read(ser.fileno(), 4096)
+        except BlockingIOError:
+            continue  # pyserial opens the fd non-blocking, and select can wake spuriously
+        if not data:
+            raise serial.SerialException("device disconnected")  # EOF: the adapter went away
+        *lines, residual = (residual + data).split(b'\n')
+        for res in lines:
             res = res.decode(errors='ignore')  # Decode to string, ignore errors if any
             print(f"Received: {res}")
 
-except serial.SerialException as e:
+except (serial.SerialException, OSError) as e:  # OSError: EIO from os.read on an unplugged adapter
     print(f"Error opening or communicating with serial port: {e}")
 except KeyboardInterrupt:
     print("Interrupted by user. Exiting...")
@@ -1,2 +1,3 @@
 from .bitconvert import convert_to_base256, convert_to_32bit, split_32bit_to_16bit
-from .initialserial import initialize_serial_connections, monitor_serial_ports
\ No newline at end of file
+from .initialserial import initialize_serial_connections, monitor_serial_ports
+from .retry import backoff
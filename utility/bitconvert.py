@@ -1,3 +1,5 @@
+import functools
+
 def convert_to_base256(value):
     """Breaks down the target_value into an array where each element represents a byte (base 256).
 
@@ -7,35 +9,32 @@ def convert_to_base256(value):
     Returns:
         list of int: The base256 representation of the number.
     """
-    base256 = []
-    while value > 0:
-        base256.append(value % 256)
-        value //= 256
-    base256.reverse()  # Reverse to get the correct order
-    return base256
+    if value <= 0:
+        return []  # Zero and negative values have no base-256 digits
+    # int.to_bytes runs the divide-by-256 loop in C, most significant byte first
+    return list(value.to_bytes((value.bit_length() + 7) // 8, "big"))
 
 def convert_to_32bit(value):
     """Converts a given integer to its 32-bit representation (4 bytes)."""
     if value < 0 or value > 0xFFFFFFFF:
         raise ValueError("Value out of range for 32-bit conversion")
     
-    # Convert to 4 bytes (32 bits)
-    base256 = [
-        (value >> 24) & 0xFF,  # Most significant byte
-        (value >> 16) & 0xFF,
-        (value >> 8) & 0xFF,
-        value & 0xFF           # Least significant byte
-    ]
-    return base256
+    # Convert to 4 bytes (32 bits), most significant byte first
+    return list(value.to_bytes(4, "big"))
 
+@functools.lru_cache(maxsize=256)
 def split_32bit_to_16bit(value):
     """Splits a 32-bit integer into two 16-bit words.
 
+    A scale reports the same weight for as long as the item sits on it, so
+    the split is cached. The result is a tuple, so the cached value shared
+    between callers cannot be changed by one of them.
+
     Args:
         value (int): The 32-bit integer to split.
 
     Returns:
-        list of int: A list containing two 16-bit integers [high_word, low_word].
+        tuple of int: Two 16-bit integers (low_word, high_word).
     """
     if value < 0 or value > 0xFFFFFFFF:
         raise ValueError("Value out of range for 32-bit conversion")
@@ -44,4 +43,4 @@ def split_32bit_to_16bit(value):
     low_word = value & 0xFFFF      # Lower 16 bits (0 - 65535)
     high_word = (value >> 16) & 0xFFFF  # Upper 16 bits (0 - 65535)
 
-    return [low_word, high_word]
\ No newline at end of file
+    return (low_word, high_word)
@@ -1,8 +1,10 @@
 
+import functools
+import select
 import time
-import sys
 import logging
 import serial
+from .retry import backoff
 
 # Map string values to the corresponding `serial` constants
 bytesize_map = {
@@ -25,7 +27,29 @@ stopbits_map = {
     'TWO': serial.STOPBITS_TWO
 }
 
-def initialize_serial_connections(serial_ports, baudrate=19200, bytesize='SEVENBITS', parity='EVEN', stopbits='ONE', timeout=1):
+def _serial_settings(baudrate=19200, bytesize='SEVENBITS', parity='EVEN', stopbits='ONE', timeout=1):
+    """Resolves the settings taken by initialize_serial_connections into serial.Serial arguments."""
+    return {
+        "baudrate": baudrate,
+        "bytesize": bytesize_map.get(bytesize, serial.SEVENBITS),
+        "parity": parity_map.get(parity, serial.PARITY_EVEN),
+        "stopbits": stopbits_map.get(stopbits, serial.STOPBITS_ONE),
+        "timeout": timeout,
+    }
+
+def _open_serial_port(port, settings, low_latency):
+    """Opens one port with settings from _serial_settings(); raises SerialException on failure."""
+    ser = serial.Serial(port=port, **settings)
+    if low_latency:
+        try:
+            ser.set_low_latency_mode(True)
+        except (AttributeError, ValueError, NotImplementedError) as e:
+            # Not every driver supports TIOCSSERIAL, and pyserial only implements
+            # it on Linux; the port still works without it
+            logging.warning("Could not enable low latency mode on %s: %s", port, e)
+    return ser
+
+def initialize_serial_connections(serial_ports, baudrate=19200, bytesize='SEVENBITS', parity='EVEN', stopbits='ONE', timeout=1, low_latency=True):
     """
     Initializes serial connections for all ports in the serial_ports dictionary.
 
@@ -50,6 +74,11 @@ def initialize_serial_connections(serial_ports, baudrate=19200, bytesize='SEVENB
     
     timeout : float, optional
         Timeout in seconds for the serial connection, default is 1 second.
+
+    low_latency : bool, optional
+        Set ASYNC_LOW_LATENCY on each port so USB serial drivers such as FTDI
+        pass received bytes on at once instead of holding them for their
+        latency timer (16 ms by default), default is True.
     
     Raises
     ------
@@ -57,20 +86,15 @@ def initialize_serial_connections(serial_ports, baudrate=19200, bytesize='SEVENB
         If a port fails to open.
     """
 
-    # Configure logging
+    # Configure logging; does nothing once the application has set up the root logger
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-    for port in serial_ports.keys():
+    # Every port uses the same settings, so resolve them once
+    settings = _serial_settings(baudrate, bytesize, parity, stopbits, timeout)
+
+    for port in serial_ports:
         try:
-            ser = serial.Serial(
-                port=port,
-                baudrate=baudrate,
-                bytesize=bytesize_map.get(bytesize, serial.SEVENBITS),
-                parity=parity_map.get(parity, serial.PARITY_EVEN),
-                stopbits=stopbits_map.get(stopbits, serial.STOPBITS_ONE),
-                timeout=timeout
-            )
-            serial_ports[port] = ser
+            serial_ports[port] = _open_serial_port(port, settings, low_latency)
             logging.info("Opened serial port %s successfully.", port)
         except serial.SerialException as e:
             logging.error("Failed to open serial port %s: %s", port, e)
@@ -78,7 +102,7 @@ def initialize_serial_connections(serial_ports, baudrate=19200, bytesize='SEVENB
     
     return serial_ports
 
-def send_ping_token(ser, max_retries=3):
+def send_ping_token(ser, max_retries=3, reply_timeout=5):
     """
     Sends a PING token to check if the device on the serial port is ready to receive data.
     If the device responds with any content, it is treated as a valid response.
@@ -90,6 +114,9 @@ def send_ping_token(ser, max_retries=3):
     
     max_retries : int
         Maximum number of retries for the PING check if the device doesn't respond.
+
+    reply_timeout : float, optional
+        Seconds one attempt waits for a complete reply line, default is 5.
     
     Returns
     -------
@@ -102,11 +129,23 @@ def send_ping_token(ser, max_retries=3):
             # Send a PING token (optional: depending on how your device is set up)
             #ping_token = b'PING'  # PING token;
             #ser.write(ping_token)
-            response = ser.readline()  # Read the response from the device
-            
+
+            # Sleep in the kernel until the device sends something, then take
+            # everything already buffered per read until the reply line is complete
+            response = bytearray()
+            deadline = time.monotonic() + reply_timeout
+            while b'\n' not in response:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                readable, _, _ = select.select([ser.fileno()], [], [], remaining)
+                if not readable:
+                    break
+                response += ser.read(ser.in_waiting or 1)
+
             # Check if the response contains any data (non-empty response)
             if response.strip():  # strip() removes any leading/trailing whitespace or newline
-                logging.info("Valid response from %s: %s", ser.name, response.decode('utf-8'))
+                logging.info("Valid response from %s: %r", ser.name, bytes(response))
                 return True
             
             # Log if the response is empty
@@ -116,14 +155,75 @@ def send_ping_token(ser, max_retries=3):
             logging.error("Failed to send PING token to %s: %s", ser.name, e)
         
         retries += 1
-        time.sleep(5)  # Wait a bit before retrying
+        if retries < max_retries:
+            time.sleep(backoff(retries - 1, 0.1))  # Do not hammer a device that just failed
     
     # If retries are exhausted and no valid response, return False
     return False
 
-def monitor_serial_ports(serial_ports, stop_event=None):
+def _reopen_serial_port(serial_ports, port, failures, stop_event, max_failures, open_port, close_first=False):
+    """
+    Reopen one serial port, waiting with jittered exponential backoff after a failure.
+
+    Parameters
+    ----------
+    serial_ports : dict
+        Dictionary of serial ports; a port that was never opened gets its new serial object here.
+
+    port : str
+        The port name, used for logging and as the key in serial_ports and failures.
+
+    failures : dict
+        Consecutive failed attempts per port name; updated in place.
+
+    stop_event : threading.Event
+        Waited on between attempts, so a shutdown is not held up by the backoff.
+
+    max_failures : int
+        Consecutive failures after which the port is given up on.
+
+    open_port : callable
+        Called with the port name to open a port that has no serial object yet.
+
+    close_first : bool, optional
+        Close the port before reopening it, default is False.
+
+    Returns
+    -------
+    bool
+        False once the port failed max_failures times in a row, True otherwise.
+    """
+    ser = serial_ports[port]
+    try:
+        if ser is None:
+            # The port failed to open at startup, so there is no object to reopen
+            serial_ports[port] = open_port(port)
+        else:
+            if close_first:
+                ser.close()
+            ser.open()
+    except Exception as e:
+        failures[port] = failures.get(port, 0) + 1
+        if failures[port] >= max_failures:
+            logging.critical("Failed to reconnect serial port %s %d times in a row: %s.", port, failures[port], e)
+            return False
+        wait = backoff(failures[port], 1)
+        logging.warning("Failed to reconnect serial port %s (attempt %d): %s. Retrying in %.1f seconds.",
+                        port, failures[port], e, wait)
+        stop_event.wait(wait)
+        return True
+
+    failures.pop(port, None)
+    logging.info("Reconnected serial port %s.", port)
+    return True
+
+def monitor_serial_ports(serial_ports, stop_event=None, max_failures=10, **serial_settings):
     """
     Monitors the state of serial ports, ensuring they remain open and reconnects if a port is closed.
+
+    A port that cannot be reopened is retried with jittered exponential
+    backoff, capped at 30 seconds. Only after max_failures failures in a row
+    is stop_event set, so the rest of the program can shut down cleanly.
     
     Parameters
     ----------
@@ -132,46 +232,55 @@ def monitor_serial_ports(serial_ports, stop_event=None):
     
     stop_event : threading.Event
         Used to signal the monitoring thread to stop.
+
+    max_failures : int, optional
+        Consecutive failed reconnects of one port before giving up, default is 10.
+
+    **serial_settings
+        Settings of initialize_serial_connections, used to open a port whose
+        value is still None because it failed to open at startup.
     """
+    failures = {}  # Consecutive failed reconnects per port
+    low_latency = serial_settings.pop("low_latency", True)
+    open_port = functools.partial(_open_serial_port, settings=_serial_settings(**serial_settings),
+                                  low_latency=low_latency)
+
     while not stop_event.is_set():
         all_ports_open = True  # Flag to track the health of all ports
         
         for port in list(serial_ports.keys()):
             ser = serial_ports[port]
+            opened = ser is not None and ser.is_open  # Only re-read after a reconnect attempt
             
             # Check if the port is not initialized or not open
-            if ser is None or not ser.is_open:
+            if not opened:
                 logging.warning("Serial port %s is not open. Attempting to reconnect.", port)
                 
-                try:
-                    # Attempt to reopen the serial port
-                    ser.open()
-                    logging.info("Reconnected serial port %s.", port)
-                except Exception as e:
-                    # If reconnection fails, log the error and exit
-                    logging.critical("Failed to reconnect serial port %s: %s. Exiting program.", port, e)
-                    sys.exit(1)
+                # Attempt to reopen the serial port
+                if not _reopen_serial_port(serial_ports, port, failures, stop_event, max_failures, open_port):
+                    stop_event.set()  # Give up and let the program shut down
+                    return
+                ser = serial_ports[port]
+                opened = ser is not None and ser.is_open
             
             # Check if the device on the port is ready using the PING token
-            if ser is not None and ser.is_open:
+            if opened:
                 if send_ping_token(ser):
                     logging.debug("Serial port %s is open, healthy, and responsive.", port)
                 else:
                     logging.warning("Serial port %s is open, but the device is not responding to PING. Attempting to reconnect.", port)
-                    try:
-                        ser.close()
-                        ser.open()
-                        logging.info("Reconnected serial port %s after failed PING response.", port)
-                    except Exception as e:
-                        logging.critical("Failed to reconnect serial port %s after failed PING: %s. Exiting program.", port, e)
-                        sys.exit(1)  # Exit if PING fails and reconnection is unsuccessful
+                    if not _reopen_serial_port(serial_ports, port, failures, stop_event, max_failures, open_port,
+                                               close_first=True):
+                        stop_event.set()  # Give up and let the program shut down
+                        return
+                    opened = ser.is_open
                         
             # Flag if any port is not healthy
-            if ser is None or not ser.is_open:
+            if not opened:
                 all_ports_open = False
         
         # If all ports are open and healthy, print a success message (optional)
         if all_ports_open:
             #logging.info("All serial ports are open, healthy, and responsive.")
             continue
-        time.sleep(1)  # Check status periodically
\ No newline at end of file
+        stop_event.wait(1)  # Check status periodically; returns at once when stopped
@@ -0,0 +1,25 @@
+import random
+
+def backoff(attempt, base, cap=30):
+    """
+    Returns the delay before the next retry: exponential in attempt, capped, with jitter.
+
+    The jitter keeps clients that failed together from retrying in lockstep.
+
+    Parameters
+    ----------
+    attempt : int
+        Number of retries already made, starting at 0.
+
+    base : float
+        Delay in seconds for the first retry, before jitter.
+
+    cap : float, optional
+        Upper limit for the delay before jitter, default is 30 seconds.
+
+    Returns
+    -------
+    float
+        A delay between half and all of min(cap, base * 2 ** attempt).
+    """
+    return min(cap, base * (2 ** attempt)) * (0.5 + random.random() * 0.5)